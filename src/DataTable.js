@@ -10,6 +10,12 @@ export default function DataTable() {
   const [currentPage, setCurrentPage] = useState(1);
   const [totalPages, setTotalPages] = useState(0);
   const [totalItems, setTotalItems] = useState(0);
+  const [cursor, setCursor] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [prevCursor, setPrevCursor] = useState(null);
+  const [lastCursor, setLastCursor] = useState(null);
+  // بعد از پرش به انتها، شماره صفحه‌ها از انتها شمرده می‌شود (۰ یعنی صفحه آخر)
+  const [pagesFromEnd, setPagesFromEnd] = useState(null);
   const [filters, setFilters] = useState({ name: "", city: "", job: "", age: "" });
   const [connectionStatus, setConnectionStatus] = useState('در حال اتصال...');
 
@@ -41,7 +47,7 @@ export default function DataTable() {
     setLoading(true);
     try {
       const params = new URLSearchParams({
-        page: currentPage,
+        cursor: cursor,
         per_page: itemsPerPage,
         name: filters.name,
         city: filters.city,
@@ -62,12 +68,17 @@ export default function DataTable() {
       setData(updatedData || []);
       setTotalPages(result.total_pages || 0);
       setTotalItems(result.total_items || 0);
+      setNextCursor(result.next_cursor);
+      setPrevCursor(result.prev_cursor);
+      setLastCursor(result.last_cursor);
       setError(null);
     } catch (err) {
       setError(err.message);
       setData([]);
       setTotalPages(0);
       setTotalItems(0);
+      setNextCursor(null);
+      setPrevCursor(null);
     } finally {
       setLoading(false);
     }
@@ -76,20 +87,37 @@ export default function DataTable() {
   useEffect(() => {
     fetchData();
     // eslint-disable-next-line
-  }, [currentPage, filters]);
+  }, [cursor, filters]);
 
-  const goToPage = (page) => {
-    if (page >= 1 && page <= totalPages) setCurrentPage(page);
+  // صفحه‌بندی کرسری: فقط جابه‌جایی به صفحه قبلی/بعدی/ابتدا/انتها
+  const goToCursor = (page, nextValue, fromEnd = null) => {
+    if (nextValue === null || nextValue === undefined) return;
+    setCurrentPage(page);
+    setPagesFromEnd(fromEnd);
+    setCursor(nextValue);
   };
 
+  // صفحه آخر همیشه itemsPerPage ردیف آخر است و ممکن است با صفحه قبلش هم‌پوشانی داشته باشد،
+  // پس بعد از پرش به انتها شماره صفحه از ابتدا معتبر نیست
+  const stepFromEnd = (delta) => (pagesFromEnd === null ? null : pagesFromEnd + delta);
+
+  const firstRow =
+    pagesFromEnd === null
+      ? (currentPage - 1) * itemsPerPage + 1
+      : Math.max(1, totalItems - pagesFromEnd * itemsPerPage - data.length + 1);
+
   const handleFilterChange = (field, value) => {
     setFilters({ ...filters, [field]: value });
     setCurrentPage(1);
+    setPagesFromEnd(null);
+    setCursor("");
   };
 
   const clearFilters = () => {
     setFilters({ name: "", city: "", job: "", age: "" });
     setCurrentPage(1);
+    setPagesFromEnd(null);
+    setCursor("");
   };
 
   const toggleUserStatus = async (userId) => {
@@ -204,7 +232,7 @@ export default function DataTable() {
               {data.length > 0 ? (
                 data.map((item, idx) => (
                   <tr key={item.id} className={!item.isActive ? "inactive-user" : ""}>
-                    <td>{(currentPage - 1) * itemsPerPage + idx + 1}</td>
+                    <td>{firstRow + idx}</td>
                     <td>{item.name}</td>
                     <td>{item.age}</td>
                     <td>{item.city}</td>
@@ -239,30 +267,34 @@ export default function DataTable() {
       {totalPages > 0 && (
         <div className="pagination">
           <span>
-            نمایش {(currentPage - 1) * itemsPerPage + 1} تا{" "}
-            {Math.min(currentPage * itemsPerPage, totalItems)} از{" "}
+            نمایش {firstRow} تا{" "}
+            {firstRow + data.length - 1} از{" "}
             {totalItems} مورد
           </span>
           <div className="page-buttons">
-            <button onClick={() => goToPage(1)} disabled={currentPage === 1}>
+            <button onClick={() => goToCursor(1, "")} disabled={!prevCursor}>
               ابتدا
             </button>
-            <button onClick={() => goToPage(currentPage - 1)} disabled={currentPage === 1}>
+            <button
+              onClick={() => goToCursor(currentPage - 1, prevCursor, stepFromEnd(1))}
+              disabled={!prevCursor}
+            >
               قبلی
             </button>
-            {Array.from({ length: totalPages }, (_, i) => i + 1).map((page) => (
-              <button
-                key={page}
-                onClick={() => goToPage(page)}
-                className={currentPage === page ? "active" : ""}
-              >
-                {page}
-              </button>
-            ))}
-            <button onClick={() => goToPage(currentPage + 1)} disabled={currentPage === totalPages}>
+            <button className="active">
+              {pagesFromEnd === null
+                ? currentPage
+                : pagesFromEnd === 0
+                ? "آخر"
+                : `${pagesFromEnd} صفحه مانده به آخر`}
+            </button>
+            <button
+              onClick={() => goToCursor(currentPage + 1, nextCursor, stepFromEnd(-1))}
+              disabled={!nextCursor}
+            >
               بعدی
             </button>
-            <button onClick={() => goToPage(totalPages)} disabled={currentPage === totalPages}>
+            <button onClick={() => goToCursor(totalPages, lastCursor, 0)} disabled={!nextCursor}>
               انتها
             </button>
           </div>
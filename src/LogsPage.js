@@ -5,9 +5,16 @@ export default function LogsPage() {
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
+  const [cursor, setCursor] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [prevCursor, setPrevCursor] = useState(null);
+
+  const perPage = 50;
 
   useEffect(() => {
-    fetch("http://127.0.0.1:5000/api/logs", {
+    setLoading(true);
+    const params = new URLSearchParams({ cursor: cursor, per_page: perPage });
+    fetch(`http://127.0.0.1:5000/api/logs?${params}`, {
       credentials: "include"
     })
       .then(res => {
@@ -15,14 +22,17 @@ export default function LogsPage() {
         return res.json();
       })
       .then(data => {
-        setLogs(data);
+        setLogs(data.items);
+        setNextCursor(data.next_cursor);
+        setPrevCursor(data.prev_cursor);
+        setError("");
         setLoading(false);
       })
       .catch(err => {
         setError(err.message);
         setLoading(false);
       });
-  }, []);
+  }, [cursor]);
 
   return (
     <div className="logs-container" dir="rtl">
@@ -51,6 +61,14 @@ export default function LogsPage() {
           </tbody>
         </table>
       )}
+      <div className="pagination">
+        <button onClick={() => setCursor(prevCursor)} disabled={!prevCursor}>
+          جدیدتر
+        </button>
+        <button onClick={() => setCursor(nextCursor)} disabled={!nextCursor}>
+          قدیمی‌تر
+        </button>
+      </div>
     </div>
   );
-}
\ No newline at end of file
+}
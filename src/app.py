@@ -1,24 +1,114 @@
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, request, jsonify, render_template, session, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import math
-from datetime import datetime
+import json
+import base64
+import binascii
+import csv
+import io
+import hashlib
+import hmac
+import time
+from datetime import datetime, timezone
+from cache import TTLCache, LRUCache, DataVersion
+from audit import AuditWriter
+from serialization import FastJSONProvider
+from metrics import Metrics
+from database import (READ_BIND, ReadRoutingSession, apply_sqlite_pragmas, engine_options,
+                      is_sqlite, is_sqlite_memory, sqlite_read_only_url)
+import search
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = 'my-very-secret-key'
 CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}})
 
-# تنظیمات پایگاه داده
+# تنظیمات پایگاه داده؛ با DATABASE_URL می‌توان بدون تغییر کد به پایگاه داده سرور رفت
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'users.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'users.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# engine جدا برای مسیرهای GET: آدرس replica، یا همان فایل SQLite در حالت فقط‌خواندنی
+app.config['DATABASE_READ_URL'] = os.environ.get('DATABASE_READ_URL')
+app.config['DB_READ_ENGINE'] = os.environ.get('DB_READ_ENGINE', '0') == '1'
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '0') == '1'
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+# مقدار منفی یعنی کیلوبایت (۶۴ مگابایت)
+app.config['SQLITE_CACHE_SIZE'] = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))
 
-db = SQLAlchemy()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    app.config, app.config['SQLALCHEMY_DATABASE_URI'])
+if app.config['DATABASE_READ_URL'] or app.config['DB_READ_ENGINE']:
+    read_url = app.config['DATABASE_READ_URL']
+    # SQLite در حافظه فایل مشترکی ندارد که بتوان دوباره فقط‌خواندنی باز کرد
+    if (not read_url and is_sqlite(app.config['SQLALCHEMY_DATABASE_URI'])
+            and not is_sqlite_memory(app.config['SQLALCHEMY_DATABASE_URI'])):
+        read_url = sqlite_read_only_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if read_url:
+        app.config['SQLALCHEMY_BINDS'] = {
+            READ_BIND: {'url': read_url, **engine_options(app.config, read_url)},
+        }
+# تنظیمات شمارش کاربران
+app.config['USER_COUNT_CACHE_TTL'] = 30
+app.config['USER_COUNT_CACHE_SIZE'] = 256
+app.config['USER_COUNT_ESTIMATE_THRESHOLD'] = 10000
+# تنظیمات نویسنده پس‌زمینه لاگ
+app.config['AUDIT_ASYNC'] = True
+app.config['AUDIT_QUEUE_SIZE'] = 10000
+app.config['AUDIT_BATCH_SIZE'] = 500
+app.config['AUDIT_FLUSH_INTERVAL'] = 1.0
+app.config['AUDIT_ENQUEUE_TIMEOUT'] = 0.05
+# تنظیمات کش پاسخ‌ها و ETag
+app.config['RESPONSE_CACHE_ENABLED'] = False
+app.config['RESPONSE_CACHE_SIZE'] = 512
+app.config['RESPONSE_CACHE_MAX_BYTES'] = 16 * 1024 * 1024
+# نسخه جدول‌ها در پایگاه داده است؛ هر پردازه آن را حداکثر این چند ثانیه نگه می‌دارد
+app.config['DATA_VERSION_TTL'] = 1.0
+# تنظیمات عملیات گروهی کاربران
+app.config['BULK_CHUNK_SIZE'] = 1000
+app.config['BULK_MAX_ERRORS'] = 1000
+# اندازه‌گیری اختیاری درخواست‌ها و پرس‌وجوها (Server-Timing و /api/metrics)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '0') == '1'
+app.config['SLOW_QUERY_MS'] = int(os.environ.get('SLOW_QUERY_MS', 100))
+app.config['SLOW_QUERY_SAMPLES'] = 50
+app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED', '0') == '1'
+app.config['PROFILER_INTERVAL'] = 0.005
+# /api/metrics فقط برای کاربر واردشده، یا با سرآیند «Authorization: Bearer <token>» برای Prometheus
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+db = SQLAlchemy(session_options={'class_': ReadRoutingSession})
 db.init_app(app)
 
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        apply_sqlite_pragmas(engine, app.config, read_only=bind_key == READ_BIND)
+
+metrics = None
+if app.config['METRICS_ENABLED']:
+    metrics = Metrics(
+        slow_query_ms=app.config['SLOW_QUERY_MS'],
+        slow_query_samples=app.config['SLOW_QUERY_SAMPLES'],
+        profiler_interval=app.config['PROFILER_INTERVAL'],
+    )
+    with app.app_context():
+        metrics.init_app(app, db.engines.values())
+    if app.config['PROFILER_ENABLED']:
+        metrics.profiler.start()
+
 # مدل کاربر
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,6 +118,14 @@ class User(db.Model):
     job = db.Column(db.String(100), nullable=False)
     isActive = db.Column(db.Boolean, default=True)
 
+    # ایندکس‌های (کلید مرتب‌سازی، id) برای صفحه‌بندی کرسری
+    __table_args__ = (
+        db.Index('ix_user_name_id', 'name', 'id'),
+        db.Index('ix_user_age_id', 'age', 'id'),
+        db.Index('ix_user_city_id', 'city', 'id'),
+        db.Index('ix_user_job_id', 'job', 'id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -61,14 +159,29 @@ class AdminUser(db.Model):
             'last_login': self.last_login.isoformat() if self.last_login else None
         }
 
+# قالب ذخیره زمان مطابق CURRENT_TIMESTAMP در SQLite تا مقایسه‌ها روی ایندکس درست باشد
+LOG_TIMESTAMP = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d '
+                                   '%(hour)02d:%(minute)02d:%(second)02d'),
+    'sqlite',
+)
+
 class Log(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     affected_id = db.Column(db.Integer, nullable=True)
     action = db.Column(db.String(100), nullable=False)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(LOG_TIMESTAMP, server_default=db.func.now())
     details = db.Column(db.Text)
 
+    # ایندکس‌های ترکیبی برای صفحه‌بندی کرسری و فیلترهای لاگ
+    __table_args__ = (
+        db.Index('ix_log_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_log_user_timestamp_id', 'user_id', 'timestamp', 'id'),
+        db.Index('ix_log_affected_timestamp_id', 'affected_id', 'timestamp', 'id'),
+        db.Index('ix_log_action_timestamp_id', 'action', 'timestamp', 'id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -79,6 +192,22 @@ class Log(db.Model):
             'details': self.details
         }
 
+# شمارنده نسخه هر جدول، مشترک بین همه workerها و سرورها
+class TableVersion(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.Float, nullable=False)
+
+# ستون‌های خروجی لیست‌ها؛ لیست‌ها به جای اشیای ORM از ردیف‌های ساده ستونی ساخته می‌شوند
+USER_FIELDS = ('id', 'name', 'age', 'city', 'job', 'isActive')
+LOG_FIELDS = ('id', 'user_id', 'affected_id', 'action', 'timestamp', 'details')
+
+def select_fields(model, fields):
+    return db.session.query(*(getattr(model, field) for field in fields))
+
+def rows_to_dicts(rows, fields):
+    return [dict(zip(fields, row)) for row in rows]
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -87,18 +216,36 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def write_log_batch(rows):
+    # اتصال جدا از session درخواست؛ کل دسته در یک تراکنش درج می‌شود
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(Log.__table__.insert(), rows)
+
+audit_writer = AuditWriter(
+    write_log_batch,
+    queue_size=app.config['AUDIT_QUEUE_SIZE'],
+    batch_size=app.config['AUDIT_BATCH_SIZE'],
+    flush_interval=app.config['AUDIT_FLUSH_INTERVAL'],
+    enqueue_timeout=app.config['AUDIT_ENQUEUE_TIMEOUT'],
+)
+
 def log_action(user_id, action, affected_id=None, details=None):
-    try:
-        log = Log(
-            user_id=user_id,
-            action=action,
-            affected_id=affected_id,
-            details=details
-        )
-        db.session.add(log)
-        db.session.commit()
-    except Exception as e:
-        print(f"Logging failed: {e}")
+    row = {
+        'user_id': user_id,
+        'action': action,
+        'affected_id': affected_id,
+        'details': details,
+        # زمان رویداد هنگام ثبت گرفته می‌شود، نه هنگام درج دسته‌ای
+        'timestamp': datetime.utcnow().replace(microsecond=0),
+    }
+    if app.config['AUDIT_ASYNC']:
+        audit_writer.submit(row)
+    else:
+        try:
+            write_log_batch([row])
+        except Exception:
+            app.logger.exception('Logging failed')
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -129,43 +276,399 @@ def logout():
         log_action(user_id, "logout", details="خروج از سیستم")
     return jsonify({'message': 'با موفقیت خارج شدید'})
 
+USER_SORT_COLUMNS = {
+    'id': User.id,
+    'name': User.name,
+    'age': User.age,
+    'city': User.city,
+    'job': User.job,
+}
+
+USER_TEXT_FILTERS = ('name', 'city', 'job')
+USER_AGE_FILTERS = ('age', 'age_min', 'age_max')
+
+def user_sort_columns(sort):
+    """ستون‌های ترتیب پایدار: کلید مرتب‌سازی و سپس id (برای sort=id فقط یک ستون)."""
+    if sort == 'id':
+        return (User.id,)
+    return (USER_SORT_COLUMNS[sort], User.id)
+
+def user_filter_args():
+    """فیلترهای غیرخالی درخواست به صورت نرمال‌شده. سن نامعتبر ValueError می‌دهد."""
+    filters = {}
+    for field in USER_TEXT_FILTERS:
+        value = search.normalize_persian(request.args.get(field, ''))
+        if value:
+            filters[field] = value
+    for field in USER_AGE_FILTERS:
+        value = request.args.get(field, '').strip()
+        if value:
+            filters[field] = int(value)
+    return filters
+
+_user_search_enabled = None
+
+def user_search_enabled(connection=None):
+    """آیا جدول FTS5 جستجو در این پایگاه داده وجود دارد (یک بار بررسی می‌شود)."""
+    global _user_search_enabled
+    if _user_search_enabled is None:
+        if db.engine.dialect.name != 'sqlite':
+            _user_search_enabled = False
+        elif connection is not None:
+            _user_search_enabled = search.search_table_exists(connection)
+        else:
+            with db.engine.connect() as conn:
+                _user_search_enabled = search.search_table_exists(conn)
+    return _user_search_enabled
+
+def user_search_ids(filters):
+    """زیرپرس‌وجوی شناسه کاربران منطبق از ایندکس FTS5."""
+    table = db.table(search.SEARCH_TABLE, *(db.column(c) for c in search.SEARCH_COLUMNS))
+    match, short = search.build_match(filters)
+    ids = db.select(db.literal_column(f'{search.SEARCH_TABLE}.rowid')).select_from(table)
+    if match:
+        ids = ids.where(db.literal_column(search.SEARCH_TABLE).op('MATCH')(match))
+    for column, value in short.items():
+        ids = ids.where(table.c[column].like(f'%{value}%'))
+    return ids
+
+def filter_users(query, filters):
+    if any(field in filters for field in USER_TEXT_FILTERS):
+        if user_search_enabled():
+            query = query.filter(User.id.in_(user_search_ids(filters)))
+        else:
+            # ستون‌ها نرمال نشده‌اند، پس عبارت خام درخواست مقایسه می‌شود
+            for field in USER_TEXT_FILTERS:
+                if field in filters:
+                    raw = request.args.get(field, '').strip()
+                    query = query.filter(getattr(User, field).ilike(f"%{raw}%"))
+    if 'age' in filters:
+        query = query.filter(User.age == filters['age'])
+    if 'age_min' in filters:
+        query = query.filter(User.age >= filters['age_min'])
+    if 'age_max' in filters:
+        query = query.filter(User.age <= filters['age_max'])
+    return query
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def index_user(mapper, connection, target):
+    if not user_search_enabled(connection):
+        return
+    state = db.inspect(target)
+    if state.attrs.name.history.has_changes() or state.attrs.city.history.has_changes() \
+            or state.attrs.job.history.has_changes():
+        search.index_rows(connection, [(target.id, target.name, target.city, target.job)])
+
+@event.listens_for(User, 'after_delete')
+def unindex_user(mapper, connection, target):
+    if user_search_enabled(connection):
+        search.unindex_rows(connection, [target.id])
+
+user_count_cache = TTLCache(
+    ttl=app.config['USER_COUNT_CACHE_TTL'],
+    maxsize=app.config['USER_COUNT_CACHE_SIZE'],
+)
+
+_table_version_ready = False
+
+def ensure_table_version():
+    """جدول نسخه را برای پایگاه داده‌های قدیمی‌تر می‌سازد (یک بار در هر پردازه).
+
+    initialize_database زیر gunicorn یا flask run اجرا نمی‌شود.
+    """
+    global _table_version_ready
+    if _table_version_ready:
+        return
+    try:
+        TableVersion.__table__.create(db.engine, checkfirst=True)
+    except OperationalError:
+        # worker دیگری همزمان جدول را ساخته است
+        if not db.inspect(db.engine).has_table(TableVersion.__tablename__):
+            raise
+    _table_version_ready = True
+
+def load_table_version(name):
+    ensure_table_version()
+    table = TableVersion.__table__
+    with db.engine.connect() as connection:
+        row = connection.execute(db.select(table.c.version, table.c.changed_at)
+                                 .where(table.c.name == name)).first()
+    # ردیف تا اولین نوشتن ساخته نمی‌شود
+    return (row.version, row.changed_at) if row else (0, 0.0)
+
+def increment_table_version(name):
+    ensure_table_version()
+    table = TableVersion.__table__
+    now = time.time()
+    with db.engine.begin() as connection:
+        updated = connection.execute(table.update().where(table.c.name == name)
+                                     .values(version=table.c.version + 1, changed_at=now))
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(name=name, version=1, changed_at=now))
+        return tuple(connection.execute(db.select(table.c.version, table.c.changed_at)
+                                        .where(table.c.name == name)).one())
+
+user_version = DataVersion(
+    load=lambda: load_table_version('user'),
+    increment=lambda: increment_table_version('user'),
+    ttl=app.config['DATA_VERSION_TTL'],
+)
+user_response_cache = LRUCache(
+    maxsize=app.config['RESPONSE_CACHE_SIZE'],
+    max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES'],
+)
+
+def invalidate_user_counts():
+    user_count_cache.clear()
+
+def mark_users_changed():
+    """بعد از هر نوشتن روی جدول کاربران: نسخه بالا می‌رود و کش‌ها خالی می‌شوند."""
+    user_version.bump()
+    invalidate_user_counts()
+    user_response_cache.clear()
+
+def conditional_user_read(f):
+    """ETag قوی از روی نسخه جدول و آرگومان‌های نرمال‌شده؛ پاسخ 304 بدون اجرای پرس‌وجو."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        version, changed_at = user_version.current()
+        key = (request.endpoint, tuple(sorted(kwargs.items())),
+               tuple(sorted(request.args.items(multi=True))))
+        etag = hashlib.blake2b(repr((version, key)).encode('utf-8'), digest_size=12).hexdigest()
+        last_modified = datetime.utcfromtimestamp(int(changed_at))
+
+        # «*» فقط وقتی برابر است که منبع وجود داشته باشد، پس پاسخ باید ساخته شود
+        any_etag = request.if_none_match.star_tag
+        # If-None-Match مقایسه ضعیف است (RFC 7232)؛ proxy یا gzip ممکن است ETag را W/ کند
+        not_modified = not any_etag and request.if_none_match.contains_weak(etag)
+        if not request.if_none_match and request.if_modified_since:
+            # دقت ثانیه است؛ مرورگرها هر دو سرآیند را می‌فرستند و ETag تغییرهای همان ثانیه را می‌گیرد
+            not_modified = last_modified <= request.if_modified_since.replace(tzinfo=None)
+        if not_modified:
+            response = app.response_class(status=304)
+        else:
+            body = None
+            if app.config['RESPONSE_CACHE_ENABLED']:
+                body = user_response_cache.get((version,) + key)
+            if body is not None:
+                response = app.response_class(body, mimetype='application/json')
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if app.config['RESPONSE_CACHE_ENABLED']:
+                    user_response_cache.set((version,) + key, response.get_data())
+            if any_etag:
+                response = app.response_class(status=304)
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+    return decorated_function
+
+def count_users(query, filters):
+    """شمارش دقیق، با کش TTL بر اساس مجموعه فیلترها و نسخه جدول.
+
+    نسخه مشترک در کلید است تا نوشتن در worker دیگر هم شمارش کهنه را کنار بگذارد.
+    """
+    key = (user_version.current()[0],) + tuple(sorted(filters.items()))
+    if not user_search_enabled():
+        # مسیر ILIKE با عبارت خام کار می‌کند، پس کلید هم باید خام باشد
+        key += tuple(request.args.get(field, '').strip() for field in USER_TEXT_FILTERS)
+    total = user_count_cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        user_count_cache.set(key, total)
+    return total
+
+def estimate_users(query, filters):
+    """شمارش محدود؛ اگر از آستانه بیشتر شد، تخمین از روی نمونه اول جدول.
+
+    خروجی (تعداد، آیا تخمینی است).
+    """
+    threshold = app.config['USER_COUNT_ESTIMATE_THRESHOLD']
+    bounded = query.order_by(None).with_entities(User.id).limit(threshold + 1)
+    matched = db.session.query(db.func.count()).select_from(bounded.subquery()).scalar()
+    if matched <= threshold:
+        return matched, False
+
+    table_rows = db.session.query(db.func.max(User.id)).scalar() or 0
+    if not filters:
+        return table_rows, True
+    sample = db.session.query(User.id).order_by(User.id).limit(threshold).subquery()
+    sample_matched = query.order_by(None).filter(User.id.in_(db.select(sample.c.id))).count()
+    return max(threshold + 1, round(table_rows * sample_matched / threshold)), True
+
+def encode_cursor(sort, direction, key=None):
+    payload = {'s': sort, 'd': direction}
+    if key is not None:
+        payload['k'] = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """در صورت نامعتبر بودن کرسر ValueError می‌دهد."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('invalid cursor')
+    if not isinstance(payload, dict) or payload.get('d') not in ('next', 'prev'):
+        raise ValueError('invalid cursor')
+    key = payload.get('k')
+    if key is not None and not isinstance(key, list):
+        raise ValueError('invalid cursor')
+    return payload['d'], payload.get('s'), key
+
+def is_datetime_column(column):
+    return isinstance(getattr(column.type, 'impl', column.type), db.DateTime)
+
+def parse_utc_datetime(value):
+    """زمان ISO به datetime بدون منطقه زمانی در UTC، مطابق ذخیره در پایگاه داده."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def cursor_key_value(column, value):
+    """مقدار کلید کرسر را با نوع ستون تطبیق می‌دهد؛ در صورت ناسازگاری ValueError."""
+    if is_datetime_column(column):
+        if not isinstance(value, str):
+            raise ValueError('invalid cursor')
+        return parse_utc_datetime(value)
+    python_type = getattr(column.type, 'impl', column.type).python_type
+    if python_type is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, python_type)
+    if not valid:
+        raise ValueError('invalid cursor')
+    return value
+
+def paginate_by_cursor(query, sort, columns, token, per_page, descending=False):
+    """صفحه‌بندی keyset روی ستون‌های columns (کلید مرتب‌سازی، id یا فقط id) بدون OFFSET.
+
+    خروجی (ردیف‌ها، کرسر بعدی، کرسر قبلی).
+    """
+    if token:
+        direction, cursor_sort, key = decode_cursor(token)
+        if cursor_sort != sort:
+            raise ValueError('cursor sort mismatch')
+    else:
+        direction, key = 'next', None
+
+    if key is not None:
+        if len(key) != len(columns):
+            raise ValueError('invalid cursor')
+        key = tuple(cursor_key_value(column, value) for column, value in zip(columns, key))
+
+    if len(columns) == 1:
+        position = columns[0]
+        if key is not None:
+            key = key[0]
+    else:
+        position = db.tuple_(*columns)
+    # جهت "next" در ترتیب اصلی جلو می‌رود؛ "prev" ترتیب را برعکس می‌کند
+    forward = (direction == 'next') != descending
+
+    if key is not None:
+        query = query.filter(position > key if forward else position < key)
+    query = query.order_by(*(column.asc() if forward else column.desc() for column in columns))
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'next':
+        has_next, has_prev = has_more, key is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = key is not None, has_more
+
+    def row_key(row):
+        return tuple(getattr(row, column.key) for column in columns)
+
+    next_cursor = encode_cursor(sort, 'next', row_key(rows[-1])) if rows and has_next else None
+    prev_cursor = encode_cursor(sort, 'prev', row_key(rows[0])) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
 @app.route('/api/users', methods=['GET'])
+@conditional_user_read
 def get_users():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 5, type=int)
-    
-    name_filter = request.args.get('name', '')
-    city_filter = request.args.get('city', '')
-    job_filter = request.args.get('job', '')
-    age_filter = request.args.get('age', '')
-    
-    query = User.query
-    
-    if name_filter:
-        query = query.filter(User.name.ilike(f'%{name_filter}%'))
-    if city_filter:
-        query = query.filter(User.city.ilike(f'%{city_filter}%'))
-    if job_filter:
-        query = query.filter(User.job.ilike(f'%{job_filter}%'))
-    if age_filter:
-        query = query.filter(User.age.ilike(f"{age_filter}%"))
-    
-    total_items = query.count()
-    total_pages = math.ceil(total_items / per_page)
-    
-    users = query.paginate(page=page, per_page=per_page)
-    
-    response = {
-        'items': [user.to_dict() for user in users.items],
+    sort = request.args.get('sort', 'id')
+
+    if per_page < 1:
+        return jsonify({'error': 'مقدار per_page نامعتبر است'}), 400
+    if sort not in USER_SORT_COLUMNS:
+        return jsonify({'error': 'فیلد مرتب‌سازی نامعتبر است'}), 400
+
+    with_total = request.args.get('with_total', 'true').lower()
+    if with_total not in ('true', 'false', 'estimate'):
+        return jsonify({'error': 'مقدار with_total نامعتبر است'}), 400
+
+    try:
+        filters = user_filter_args()
+    except ValueError:
+        return jsonify({'error': 'مقدار سن نامعتبر است'}), 400
+    query = filter_users(select_fields(User, USER_FIELDS), filters)
+
+    def totals():
+        # شمارش اختیاری: true دقیق (با کش)، estimate تخمینی، false بدون شمارش
+        # فقط بعد از معتبر بودن صفحه یا کرسر اجرا می‌شود
+        response = {}
+        if with_total == 'true':
+            total_items = count_users(query, filters)
+        elif with_total == 'estimate':
+            total_items, estimated = estimate_users(query, filters)
+            response['total_is_estimate'] = estimated
+        if with_total != 'false':
+            response['total_items'] = total_items
+            response['total_pages'] = math.ceil(total_items / per_page)
+        return response
+
+    # حالت کرسری: ?cursor=<token> (مقدار خالی برای صفحه اول)
+    if 'cursor' in request.args:
+        try:
+            users, next_cursor, prev_cursor = paginate_by_cursor(
+                query, sort, user_sort_columns(sort),
+                request.args.get('cursor', ''), per_page)
+        except ValueError:
+            return jsonify({'error': 'کرسر نامعتبر است'}), 400
+
+        response = totals()
+        response.update({
+            'items': rows_to_dicts(users, USER_FIELDS),
+            'per_page': per_page,
+            'sort': sort,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'last_cursor': encode_cursor(sort, 'prev'),
+        })
+        return jsonify(response)
+
+    if page < 1:
+        return jsonify({'error': 'شماره صفحه نامعتبر است'}), 400
+
+    users = (query.order_by(*user_sort_columns(sort))
+             .limit(per_page)
+             .offset((page - 1) * per_page)
+             .all())
+
+    response = totals()
+    response.update({
+        'items': rows_to_dicts(users, USER_FIELDS),
         'page': page,
         'per_page': per_page,
-        'total_items': total_items,
-        'total_pages': total_pages
-    }
+    })
     
     return jsonify(response)
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
+@conditional_user_read
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
     return jsonify(user.to_dict())
@@ -187,6 +690,7 @@ def add_user():
 
     db.session.add(new_user)
     db.session.commit()
+    mark_users_changed()
     log_action(session['user_id'], "create_user", new_user.id, f"کاربر جدید با نام {new_user.name} ثبت شد")
     return jsonify(new_user.to_dict()), 201
 
@@ -206,6 +710,7 @@ def update_user(user_id):
         user.job = data['job']
     
     db.session.commit()
+    mark_users_changed()
     log_action(session['user_id'], "update_user", user_id, f"اطلاعات کاربر به‌روزرسانی شد")
     return jsonify(user.to_dict())
 
@@ -216,6 +721,7 @@ def update_user_active(user_id):
     if 'isActive' in data:
         user.isActive = data['isActive']
         db.session.commit()
+        mark_users_changed()
 
         log_action(session.get('user_id', 0), "toggle_active", user_id, f"وضعیت کاربر به {'فعال' if user.isActive else 'غیرفعال'} تغییر کرد")
         return jsonify(user.to_dict())
@@ -227,19 +733,463 @@ def delete_user(user_id):
     
     db.session.delete(user)
     db.session.commit()
+    mark_users_changed()
     
     log_action(session['user_id'], "delete_user", user_id, f"کاربر {user.name} حذف شد")
     return jsonify({'message': 'کاربر با موفقیت حذف شد'})
 
+BULK_OPS = ('insert', 'update', 'active', 'delete')
+BULK_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'text/csv')
+
+BULK_READ_SIZE = 64 * 1024
+
+def decode_bulk_lines(stream, bad_lines):
+    """خطوط بدنه را تکه تکه می‌خواند و هر خط را جدا decode می‌کند.
+
+    خطی که UTF-8 معتبر نیست به صورت خط خالی برگردانده و شماره‌اش در bad_lines ثبت می‌شود.
+    """
+    line_no = 0
+    pending = b''
+    while True:
+        data = stream.read(BULK_READ_SIZE)
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop() if data else b''
+        for raw in lines:
+            if not raw and not data:
+                continue
+            line_no += 1
+            try:
+                yield raw.decode('utf-8-sig' if line_no == 1 else 'utf-8') + '\n'
+            except UnicodeDecodeError:
+                bad_lines.append(line_no)
+                yield '\n'
+        if not data:
+            return
+
+def read_bulk_rows(mimetype):
+    """ردیف‌های ورودی را خط به خط از جریان درخواست می‌خواند (بدون بافر کردن کل بدنه).
+
+    خطای هر خط (کدگذاری، JSON یا CSV) به جای ردیف به صورت ValueError برمی‌گردد
+    تا بقیه خطوط پردازش شوند.
+    """
+    bad_lines = []
+    lines = decode_bulk_lines(request.stream, bad_lines)
+    if mimetype == 'text/csv':
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                row = next(reader, None)
+            except csv.Error:
+                row = ValueError('ردیف CSV نامعتبر است')
+            for line_no in bad_lines:
+                yield line_no, ValueError('کدگذاری خط UTF-8 نیست')
+            bad_lines.clear()
+            if row is None:
+                return
+            yield reader.line_num, row
+    for line_no, line in enumerate(lines, 1):
+        if bad_lines:
+            yield bad_lines.pop(), ValueError('کدگذاری خط UTF-8 نیست')
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, ValueError('JSON نامعتبر است')
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError('مقدار isActive نامعتبر است')
+
+def parse_bulk_row(row, default_op):
+    """خروجی (عملیات، پارامترها). ردیف نامعتبر ValueError با پیام فارسی می‌دهد."""
+    if not isinstance(row, dict):
+        raise ValueError('ردیف نامعتبر است')
+    # در CSV ستون خالی یعنی مقدار ارسال نشده
+    row = {key: value for key, value in row.items() if key and value not in ('', None)}
+    op = str(row.get('op', default_op)).strip().lower()
+    if op not in BULK_OPS:
+        raise ValueError('عملیات نامعتبر است')
+
+    params = {}
+    if op != 'insert':
+        if 'id' not in row:
+            raise ValueError('شناسه کاربر ارسال نشده است')
+        try:
+            params['b_id'] = int(row['id'])
+        except (TypeError, ValueError):
+            raise ValueError('شناسه کاربر نامعتبر است')
+
+    if op in ('insert', 'update'):
+        if op == 'insert' and not all(key in row for key in ('name', 'age', 'city', 'job')):
+            raise ValueError('اطلاعات ناقص است')
+        for key in ('name', 'city', 'job'):
+            params[f'b_{key}'] = str(row[key]) if key in row else None
+        try:
+            params['b_age'] = int(row['age']) if 'age' in row else None
+        except (TypeError, ValueError):
+            raise ValueError('مقدار سن نامعتبر است')
+
+    if op == 'insert':
+        params['b_isActive'] = parse_bool(row.get('isActive', True))
+    elif op == 'active':
+        if 'isActive' not in row:
+            raise ValueError('پارامتر isActive ارسال نشده است')
+        params['b_isActive'] = parse_bool(row['isActive'])
+    return op, params
+
+def apply_bulk_chunk(connection, chunk):
+    """یک دسته را در تراکنش جاری اعمال می‌کند. خروجی (تعداد هر عملیات، خطاها).
+
+    ترتیب اجرا در هر دسته: درج، ویرایش، تغییر وضعیت، حذف.
+    """
+    table = User.__table__
+    ids = {params['b_id'] for _, op, params in chunk if op != 'insert'}
+    existing = set()
+    id_list = list(ids)
+    for start in range(0, len(id_list), 500):
+        existing.update(connection.execute(
+            db.select(table.c.id).where(table.c.id.in_(id_list[start:start + 500]))).scalars())
+
+    grouped = {op: [] for op in BULK_OPS}
+    errors = []
+    for line, op, params in chunk:
+        if op != 'insert' and params['b_id'] not in existing:
+            errors.append({'line': line, 'error': 'کاربر یافت نشد'})
+        else:
+            grouped[op].append(params)
+
+    indexing = user_search_enabled(connection)
+    if grouped['insert']:
+        last_id = connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0
+        connection.execute(
+            table.insert().values(
+                name=db.bindparam('b_name'), age=db.bindparam('b_age'), city=db.bindparam('b_city'),
+                job=db.bindparam('b_job'), isActive=db.bindparam('b_isActive')),
+            grouped['insert'])
+        if indexing:
+            # پس از اولین درج، قفل نوشتن دست ماست؛ ایندکس دوباره ردیف‌های دیگر بی‌ضرر است
+            search.index_rows(connection, connection.execute(
+                db.select(table.c.id, table.c.name, table.c.city, table.c.job)
+                .where(table.c.id > last_id)))
+    if grouped['update']:
+        connection.execute(
+            table.update().where(table.c.id == db.bindparam('b_id')).values(
+                name=db.func.coalesce(db.bindparam('b_name'), table.c.name),
+                age=db.func.coalesce(db.bindparam('b_age'), table.c.age),
+                city=db.func.coalesce(db.bindparam('b_city'), table.c.city),
+                job=db.func.coalesce(db.bindparam('b_job'), table.c.job)),
+            grouped['update'])
+        if indexing:
+            updated = [params['b_id'] for params in grouped['update']]
+            search.index_rows(connection, connection.execute(
+                db.select(table.c.id, table.c.name, table.c.city, table.c.job)
+                .where(table.c.id.in_(updated))))
+    if grouped['active']:
+        connection.execute(
+            table.update().where(table.c.id == db.bindparam('b_id'))
+            .values(isActive=db.bindparam('b_isActive')),
+            grouped['active'])
+    if grouped['delete']:
+        connection.execute(table.delete().where(table.c.id == db.bindparam('b_id')), grouped['delete'])
+        if indexing:
+            search.unindex_rows(connection, [params['b_id'] for params in grouped['delete']])
+
+    return {op: len(rows) for op, rows in grouped.items()}, errors
+
+@app.route('/api/users/bulk', methods=['POST'])
+@login_required
+def bulk_users():
+    mimetype = request.mimetype
+    default_op = request.args.get('op', 'insert')
+    if mimetype not in BULK_MIMETYPES:
+        return jsonify({'error': 'فقط NDJSON یا CSV پذیرفته می‌شود'}), 415
+    if default_op not in BULK_OPS:
+        return jsonify({'error': 'عملیات نامعتبر است'}), 400
+
+    chunk_size = app.config['BULK_CHUNK_SIZE']
+    max_errors = app.config['BULK_MAX_ERRORS']
+    totals = {op: 0 for op in BULK_OPS}
+    errors = []
+    error_count = 0
+    user_id = session['user_id']
+
+    def add_errors(new_errors):
+        nonlocal error_count
+        error_count += len(new_errors)
+        errors.extend(new_errors[:max_errors - len(errors)])
+
+    # دسته‌ای ثبت شده ولی کش‌ها هنوز باطل نشده‌اند
+    stale = False
+
+    def flush(chunk):
+        nonlocal stale
+        if not chunk:
+            return
+        try:
+            with db.engine.begin() as connection:
+                counts, chunk_errors = apply_bulk_chunk(connection, chunk)
+        except SQLAlchemyError:
+            app.logger.exception('bulk chunk failed')
+            add_errors([{'line': line, 'error': 'خطای پایگاه داده'} for line, _, _ in chunk])
+            return
+        stale = True
+        # readerها در طول یک ورود طولانی هم باید داده ثبت‌شده را ببینند
+        mark_users_changed()
+        stale = False
+        add_errors(chunk_errors)
+        for op, count in counts.items():
+            totals[op] += count
+        log_action(user_id, "bulk_users", None,
+                   f"عملیات گروهی: {counts['insert']} درج، {counts['update']} ویرایش، "
+                   f"{counts['active']} تغییر وضعیت، {counts['delete']} حذف")
+
+    chunk = []
+    try:
+        for line, row in read_bulk_rows(mimetype):
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                op, params = parse_bulk_row(row, default_op)
+            except ValueError as e:
+                add_errors([{'line': line, 'error': str(e)}])
+                continue
+            chunk.append((line, op, params))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+    finally:
+        # اگر پس از ثبت یک دسته، باطل کردن کش‌ها به خطا خورده باشد
+        if stale:
+            mark_users_changed()
+    errors.sort(key=lambda error: error['line'])
+
+    return jsonify({
+        'inserted': totals['insert'],
+        'updated': totals['update'],
+        'toggled': totals['active'],
+        'deleted': totals['delete'],
+        'error_count': error_count,
+        'errors': errors
+    })
+
+LOG_EXPORT_BATCH = 1000
+
+def log_filter_args():
+    """فیلترهای لاگ از درخواست. مقدار نامعتبر ValueError می‌دهد."""
+    filters = {}
+    for field in ('user_id', 'affected_id'):
+        value = request.args.get(field, '').strip()
+        if value:
+            filters[field] = int(value)
+    action = request.args.get('action', '').strip()
+    if action:
+        filters['action'] = action
+    for field in ('since', 'until'):
+        value = request.args.get(field, '').strip()
+        if value:
+            # زمان‌ها در پایگاه داده به UTC و بدون منطقه زمانی ذخیره می‌شوند
+            filters[field] = parse_utc_datetime(value)
+    return filters
+
+def filter_logs(query, filters):
+    if 'user_id' in filters:
+        query = query.filter(Log.user_id == filters['user_id'])
+    if 'affected_id' in filters:
+        query = query.filter(Log.affected_id == filters['affected_id'])
+    if 'action' in filters:
+        query = query.filter(Log.action == filters['action'])
+    if 'since' in filters:
+        query = query.filter(Log.timestamp >= filters['since'])
+    if 'until' in filters:
+        query = query.filter(Log.timestamp < filters['until'])
+    return query
+
+def export_log_rows(filters):
+    """ردیف‌های لاگ به صورت دسته‌ای و با کرسر سمت سرور؛ حافظه ثابت."""
+    statement = filter_logs(
+        db.select(*(getattr(Log, column) for column in LOG_FIELDS)), filters
+    ).order_by(Log.timestamp.desc(), Log.id.desc())
+    result = db.session.execute(statement.execution_options(stream_results=True))
+    try:
+        for batch in result.partitions(LOG_EXPORT_BATCH):
+            yield batch
+    finally:
+        result.close()
+
+def format_timestamp(value):
+    return value.isoformat() + 'Z' if value else None
+
+def stream_logs_ndjson(filters):
+    for batch in export_log_rows(filters):
+        yield ''.join(app.json.dumps(item) + '\n' for item in rows_to_dicts(batch, LOG_FIELDS))
+
+def stream_logs_csv(filters):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LOG_FIELDS)
+    for batch in export_log_rows(filters):
+        for row in batch:
+            row = list(row)
+            row[4] = format_timestamp(row[4])
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
 @app.route('/api/logs', methods=['GET'])
 @login_required
 def get_logs():
-    logs = Log.query.order_by(Log.timestamp.desc()).all()
-    return jsonify([log.to_dict() for log in logs])
+    per_page = request.args.get('per_page', 50, type=int)
+    export_format = request.args.get('format', 'json')
+
+    if per_page < 1 or per_page > 500:
+        return jsonify({'error': 'مقدار per_page باید بین ۱ و ۵۰۰ باشد'}), 400
+    if export_format not in ('json', 'ndjson', 'csv'):
+        return jsonify({'error': 'قالب خروجی نامعتبر است'}), 400
+    try:
+        filters = log_filter_args()
+    except ValueError:
+        return jsonify({'error': 'فیلترهای لاگ نامعتبر است'}), 400
+
+    # خروجی جریانی کامل، بدون صفحه‌بندی
+    if export_format == 'ndjson':
+        return Response(stream_with_context(stream_logs_ndjson(filters)),
+                        mimetype='application/x-ndjson')
+    if export_format == 'csv':
+        return Response(stream_with_context(stream_logs_csv(filters)), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=logs.csv'})
+
+    try:
+        logs, next_cursor, prev_cursor = paginate_by_cursor(
+            filter_logs(select_fields(Log, LOG_FIELDS), filters), 'timestamp', (Log.timestamp, Log.id),
+            request.args.get('cursor', ''), per_page, descending=True)
+    except ValueError:
+        return jsonify({'error': 'کرسر نامعتبر است'}), 400
+
+    return jsonify({
+        'items': rows_to_dicts(logs, LOG_FIELDS),
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    })
+
+def collect_app_metrics():
+    audit = audit_writer.stats()
+    cache = user_response_cache.stats()
+    return {
+        'audit_queue_length': ('gauge', audit['queued']),
+        'audit_rows_written_total': ('counter', audit['written']),
+        'audit_rows_dropped_total': ('counter', audit['dropped']),
+        'audit_rows_failed_total': ('counter', audit['failed']),
+        'audit_batches_total': ('counter', audit['batches']),
+        'response_cache_entries': ('gauge', cache['entries']),
+        'response_cache_bytes': ('gauge', cache['bytes']),
+        'response_cache_hits_total': ('counter', cache['hits']),
+        'response_cache_misses_total': ('counter', cache['misses']),
+        'response_cache_evictions_total': ('counter', cache['evictions']),
+    }
+
+if metrics is not None:
+    metrics.add_collector(collect_app_metrics)
+
+def metrics_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if metrics is None:
+            return jsonify({'error': 'اندازه‌گیری فعال نیست'}), 404
+        return f(*args, **kwargs)
+    return decorated_function
+
+def metrics_scrape_allowed(f):
+    """کاربر واردشده یا توکن METRICS_TOKEN (برای scrape بدون session)."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = app.config['METRICS_TOKEN']
+        authorization = request.headers.get('Authorization', '')
+        if 'user_id' not in session and not (
+                token and hmac.compare_digest(authorization.encode('utf-8'), f'Bearer {token}'.encode('utf-8'))):
+            return jsonify({'error': 'ابتدا وارد شوید'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route('/api/metrics', methods=['GET'])
+@metrics_scrape_allowed
+@metrics_required
+def get_metrics():
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/slow-queries', methods=['GET'])
+@login_required
+@metrics_required
+def get_slow_queries():
+    return jsonify(list(metrics.slow_queries))
+
+@app.route('/api/metrics/profiler', methods=['POST'])
+@login_required
+@metrics_required
+def toggle_profiler():
+    data = request.get_json(silent=True) or {}
+    if 'enabled' not in data:
+        return jsonify({'error': 'پارامتر enabled ارسال نشده است'}), 400
+    if data.get('reset'):
+        metrics.profiler.reset()
+    if data['enabled']:
+        metrics.profiler.start()
+    else:
+        metrics.profiler.stop()
+    return jsonify({'enabled': metrics.profiler.running, 'samples': metrics.profiler.samples})
+
+@app.route('/api/metrics/profile', methods=['GET'])
+@login_required
+@metrics_required
+def get_profile():
+    return Response(metrics.profiler.collapsed(), mimetype='text/plain')
+
+# ایندکس‌هایی که نسخه‌های قبلی ساخته‌اند و دیگر لازم نیستند
+OBSOLETE_INDEXES = ('ix_user_age',)  # ix_user_age_id همان جستجوهای سن را پوشش می‌دهد
+
+def ensure_indexes():
+    # create_all برای جدول‌های موجود ایندکس جدید نمی‌سازد
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    with db.engine.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+
+def ensure_user_search():
+    # ساخت ایندکس FTS5 و پر کردن آن از جدول کاربران در اولین اجرا
+    global _user_search_enabled
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.begin() as connection:
+        if search.search_table_exists(connection) or not search.fts5_available(connection):
+            return
+        search.create_search_table(connection)
+        rows = connection.execute(db.select(User.id, User.name, User.city, User.job))
+        while True:
+            batch = rows.fetchmany(1000)
+            if not batch:
+                break
+            search.index_rows(connection, batch)
+    _user_search_enabled = True
 
 def initialize_database():
     with app.app_context():
         db.create_all()
+        ensure_indexes()
         
         if User.query.count() == 0:
             sample_users = [
@@ -262,6 +1212,12 @@ def initialize_database():
             db.session.add(admin)
             db.session.commit()
 
+        ensure_user_search()
+
+        if db.session.get(TableVersion, 'user') is None:
+            db.session.add(TableVersion(name='user', version=0, changed_at=time.time()))
+            db.session.commit()
+
 @app.route('/')
 def home():
     return jsonify({"message": "به API کاربران خوش آمدید!"})
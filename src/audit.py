@@ -0,0 +1,129 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Marker:
+    """پیام کنترلی صف: نوشتن فوری دسته جاری و در صورت stop پایان کار."""
+
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+class AuditWriter:
+    """نویسنده پس‌زمینه لاگ‌ها: صف محدود و یک thread که ردیف‌ها را دسته‌ای درج می‌کند.
+
+    write_batch(rows) یک لیست از دیکشنری‌ها را در یک تراکنش ذخیره می‌کند.
+    """
+
+    def __init__(self, write_batch, queue_size=10000, batch_size=500,
+                 flush_interval=1.0, enqueue_timeout=0.0):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # بعد از fork (مثلاً workerهای gunicorn) thread دوباره ساخته می‌شود
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """ردیف را در صف می‌گذارد؛ اگر صف پر بماند ردیف دور ریخته و شمرده می‌شود."""
+        self._ensure_started()
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning('audit queue full, %d log rows dropped so far', self.dropped)
+            return False
+        self.enqueued += 1
+        return True
+
+    def flush(self, timeout=None):
+        """تا نوشته شدن همه ردیف‌های فعلی صف صبر می‌کند."""
+        return self._send(_Marker(), timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return True
+        done = self._send(_Marker(stop=True), timeout)
+        self._thread.join(timeout)
+        return done
+
+    def _send(self, marker, timeout):
+        self._ensure_started()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.write_batch(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception('writing %d audit log rows failed', len(batch))
+        else:
+            self.written += len(batch)
+            self.batches += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while not isinstance(item, _Marker):
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            if isinstance(item, _Marker):
+                item.done.set()
+                if item.stop:
+                    return
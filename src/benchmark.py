@@ -0,0 +1,393 @@
+"""بنچمارک و تست بار API کاربران.
+
+یک پایگاه داده موقت با کاربران و لاگ‌های مصنوعی فارسی می‌سازد، مسیرهای API را
+با سطوح همزمانی مختلف صدا می‌زند و تاخیر p50/p95/p99، توان عملیاتی و بیشینه RSS
+را به صورت JSON گزارش می‌کند.
+
+با --url درخواست‌ها به سروری در حال اجرا فرستاده می‌شوند؛ داده‌ای ساخته نمی‌شود،
+تعداد کاربران از خود سرور خوانده می‌شود و RSS فقط مربوط به پردازه کلاینت است.
+
+    python benchmark.py --users 10000 --logs 10000 --concurrency 1,8 --output bench.json
+    python benchmark.py --db users.db --no-seed --concurrency 1,8
+    python benchmark.py --url http://127.0.0.1:5000 --concurrency 1,8
+
+--db روی یک نسخه موقت کار می‌کند؛ برای اجرا روی خود فایل --in-place لازم است.
+"""
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+# مقادیر پایه از ردیف‌های نمونه initialize_database
+FIRST_NAMES = ['محمد', 'سارا', 'علی', 'مریم', 'رضا', 'زهرا', 'امیر', 'نیلوفر', 'فاطمه', 'حسین',
+               'کاوه', 'یاسمن', 'مهدی', 'نگار', 'پریسا', 'سعید', 'آرش', 'شیما', 'بهرام', 'لیلا']
+LAST_NAMES = ['امینی', 'محمدی', 'رضایی', 'کریمی', 'حسینی', 'نوری', 'قاسمی', 'احمدی', 'شریفی',
+              'یزدانی', 'موسوی', 'جعفری', 'کاظمی', 'صادقی', 'رحیمی', 'طاهری', 'اکبری', 'فرهادی']
+CITIES = ['تهران', 'اصفهان', 'مشهد', 'تبریز', 'شیراز', 'کرج', 'اهواز', 'قم', 'کرمانشاه', 'رشت',
+          'یزد', 'کرمان', 'همدان', 'اراک', 'زنجان']
+JOBS = ['برنامه‌نویس', 'طراح', 'مهندس', 'پزشک', 'حسابدار', 'مدیر', 'معمار', 'معلم', 'پرستار',
+        'وکیل', 'نقاش', 'راننده', 'فروشنده', 'کارمند', 'دانشجو']
+LOG_ACTIONS = ['create_user', 'update_user', 'toggle_active', 'delete_user', 'login', 'logout']
+
+SEED_BATCH = 10000
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'admin123'
+
+
+def generate_users(count, rng):
+    for _ in range(count):
+        yield {
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'age': rng.randint(18, 70),
+            'city': rng.choice(CITIES),
+            'job': rng.choice(JOBS),
+            'isActive': rng.random() > 0.1,
+        }
+
+
+def generate_logs(count, user_count, rng):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=365)
+    step = 365 * 24 * 3600 / max(count, 1)
+    for i in range(count):
+        action = rng.choice(LOG_ACTIONS)
+        yield {
+            'user_id': 1,
+            'affected_id': None if action in ('login', 'logout') else rng.randint(1, max(user_count, 1)),
+            'action': action,
+            'timestamp': start + timedelta(seconds=int(i * step)),
+            'details': 'رکورد تستی بنچمارک',
+        }
+
+
+def batched(rows, size):
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def seed_database(api, users, logs, rng):
+    """جدول‌ها را می‌سازد و ردیف‌های مصنوعی را دسته‌ای درج می‌کند؛ ایندکس جستجو در پایان ساخته می‌شود."""
+    with api.app.app_context():
+        api.db.create_all()
+        api.ensure_indexes()
+        with api.db.engine.begin() as connection:
+            for batch in batched(generate_users(users, rng), SEED_BATCH):
+                connection.execute(api.User.__table__.insert(), batch)
+            for batch in batched(generate_logs(logs, users, rng), SEED_BATCH):
+                connection.execute(api.Log.__table__.insert(), batch)
+    api.initialize_database()
+
+
+def copy_database(source, target):
+    """نسخه سازگار از فایل SQLite، همراه با تغییرهای WAL که هنوز checkpoint نشده‌اند."""
+    if not os.path.exists(source):
+        raise SystemExit(f'پایگاه داده {source} یافت نشد')
+    src = sqlite3.connect(f'file:{os.path.abspath(source)}?mode=ro', uri=True)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class TestClientDriver:
+    """درخواست‌ها درون همین پردازه با Flask test client اجرا می‌شوند."""
+
+    def __init__(self, api):
+        self.client = api.app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpDriver:
+    """درخواست‌ها به یک سرور محلی در حال اجرا فرستاده می‌شوند."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self.opener.open(req) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+
+def server_user_count(driver):
+    """بیشترین شناسه کاربر روی سرور، از آخرین صفحه کرسری به ترتیب id."""
+    status, first = driver.request('GET', '/api/users?cursor=&per_page=1&with_total=false')
+    if status != 200 or not first:
+        raise SystemExit(f'خواندن کاربران از سرور ممکن نشد (وضعیت {status})')
+    status, last = driver.request('GET', f"/api/users?cursor={first['last_cursor']}&per_page=1&with_total=false")
+    items = last.get('items') if status == 200 and last else None
+    return items[0]['id'] if items else 1
+
+
+def filter_combinations():
+    """همه ترکیب‌های غیرخالی فیلترهای نام/شهر/شغل/سن."""
+    values = {'name': 'محمد', 'city': 'تهران', 'job': 'مهندس', 'age': '30'}
+    fields = sorted(values)
+    for size in range(1, len(fields) + 1):
+        for combo in itertools.combinations(fields, size):
+            yield '+'.join(combo), '&'.join(f'{field}={values[field]}' for field in combo)
+
+
+def build_scenarios(user_count, per_page, created_ids):
+    """خروجی: لیست (نام، نیاز به ورود، تابع تولید درخواست)."""
+    last_page = max(1, user_count // per_page)
+
+    def fixed(path):
+        return lambda rng: ('GET', path, None)
+
+    scenarios = [
+        ('users_shallow', False, fixed(f'/api/users?page=1&per_page={per_page}')),
+        ('users_deep_offset', False, fixed(f'/api/users?page={last_page}&per_page={per_page}')),
+        ('users_no_total', False, fixed(f'/api/users?page=1&per_page={per_page}&with_total=false')),
+        ('users_cursor_first', False, fixed(f'/api/users?cursor=&per_page={per_page}')),
+        ('users_age_range', False, fixed(f'/api/users?age_min=25&age_max=35&per_page={per_page}')),
+    ]
+    for name, query in filter_combinations():
+        scenarios.append((f'users_filter_{name}', False, fixed(f'/api/users?{query}&per_page={per_page}')))
+    scenarios += [
+        ('user_detail', False, lambda rng: ('GET', f'/api/users/{rng.randint(1, user_count)}', None)),
+        ('logs_page', True, fixed('/api/logs?per_page=50')),
+        ('logs_filtered', True, fixed('/api/logs?action=update_user&per_page=50')),
+    ]
+
+    def create(rng):
+        return 'POST', '/api/users', next(generate_users(1, rng))
+
+    def update(rng):
+        return 'PUT', f'/api/users/{rng.randint(1, user_count)}', {'city': rng.choice(CITIES)}
+
+    def toggle(rng):
+        return 'PATCH', f'/api/users/{rng.randint(1, user_count)}', {'isActive': rng.random() > 0.5}
+
+    def delete(rng):
+        try:
+            user_id = created_ids.pop()
+        except IndexError:
+            user_id = rng.randint(1, user_count)
+        return 'DELETE', f'/api/users/{user_id}', None
+
+    scenarios += [
+        ('write_create', True, create),
+        ('write_update', True, update),
+        ('write_toggle', True, toggle),
+        ('write_delete', True, delete),
+    ]
+    return scenarios
+
+
+def run_scenario(make_driver, needs_login, make_request, concurrency, total, seed, created_ids):
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    # زمان‌گیری بعد از ورود همه workerها شروع می‌شود
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + index)
+        driver = make_driver()
+        if needs_login:
+            driver.request('POST', '/api/login', {'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+        ready.wait()
+        local = []
+        local_errors = 0
+        while next(counter) < total:
+            method, path, body = make_request(rng)
+            started = time.perf_counter()
+            status, payload = driver.request(method, path, body)
+            local.append(time.perf_counter() - started)
+            if status >= 400:
+                local_errors += 1
+            elif method == 'POST' and isinstance(payload, dict) and 'id' in payload:
+                created_ids.append(payload['id'])
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+            'p95': round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+            'p99': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            'max': round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+    }
+
+
+def peak_rss_kb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS بایت برمی‌گرداند، لینوکس کیلوبایت
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='بنچمارک API کاربران')
+    parser.add_argument('--users', type=int, default=10000, help='تعداد کاربران مصنوعی (مثلاً 10000، 1000000، 10000000)')
+    parser.add_argument('--logs', type=int, default=10000, help='تعداد لاگ‌های مصنوعی')
+    parser.add_argument('--db', help='پایگاه داده مبدا؛ یک نسخه موقت از آن استفاده می‌شود (پیش‌فرض پایگاه داده خالی)')
+    parser.add_argument('--in-place', action='store_true',
+                        help='خود فایل --db استفاده شود؛ داده مصنوعی درج و سناریوهای نوشتن روی آن اجرا می‌شوند')
+    parser.add_argument('--no-seed', action='store_true', help='از داده‌های موجود در --db استفاده شود')
+    parser.add_argument('--url', help='آدرس سرور در حال اجرا؛ بدون آن از Flask test client استفاده می‌شود '
+                                      '(--users، --logs، --db و --response-cache نادیده گرفته می‌شوند)')
+    parser.add_argument('--concurrency', default='1,4,16', help='سطوح همزمانی، جدا شده با کاما')
+    parser.add_argument('--requests', type=int, default=200, help='تعداد درخواست هر سناریو در هر سطح')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--scenarios', help='فقط سناریوهایی که نامشان با این پیشوندها شروع می‌شود (با کاما)')
+    parser.add_argument('--response-cache', action='store_true', help='کش پاسخ درون پردازه فعال بماند')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='مسیر فایل JSON خروجی؛ پیش‌فرض stdout')
+    args = parser.parse_args(argv)
+    if args.in_place and not args.db:
+        parser.error('--in-place فقط همراه --db معنا دارد')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    api = None
+    temp_dir = None
+    seed_elapsed = None
+    if args.url:
+        # سرور داده و پایگاه داده خودش را دارد؛ اینجا چیزی ساخته یا import نمی‌شود
+        user_count = server_user_count(HttpDriver(args.url))
+        make_driver = lambda: HttpDriver(args.url)
+    else:
+        if args.db and args.in_place:
+            db_path = os.path.abspath(args.db)
+        else:
+            temp_dir = tempfile.TemporaryDirectory(prefix='users-bench-')
+            db_path = os.path.join(temp_dir.name, 'users.db')
+            if args.db:
+                copy_database(args.db, db_path)
+
+        # app باید بعد از تنظیم آدرس پایگاه داده import شود
+        os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+        import app as api
+
+        api.app.config['RESPONSE_CACHE_ENABLED'] = args.response_cache
+
+        seed_started = time.perf_counter()
+        if args.no_seed:
+            api.initialize_database()
+        else:
+            seed_database(api, args.users, args.logs, rng)
+        seed_elapsed = time.perf_counter() - seed_started
+
+        with api.app.app_context():
+            user_count = api.db.session.query(api.db.func.max(api.User.id)).scalar() or 1
+        make_driver = lambda: TestClientDriver(api)
+
+    created_ids = []
+    prefixes = tuple(args.scenarios.split(',')) if args.scenarios else None
+    results = []
+    for name, needs_login, make_request in build_scenarios(user_count, args.per_page, created_ids):
+        if prefixes and not name.startswith(prefixes):
+            continue
+        for concurrency in (int(level) for level in args.concurrency.split(',')):
+            result = run_scenario(make_driver, needs_login, make_request, concurrency,
+                                  args.requests, args.seed, created_ids)
+            result['scenario'] = name
+            results.append(result)
+            print(f"{name:<32} c={concurrency:<3} p50={result['latency_ms']['p50']}ms "
+                  f"p99={result['latency_ms']['p99']}ms rps={result['throughput_rps']}", file=sys.stderr)
+
+    meta = {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'users': user_count,
+        'mode': 'http' if args.url else 'test_client',
+        'per_page': args.per_page,
+        'requests_per_level': args.requests,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+    }
+    report = {'meta': meta}
+    if api is not None:
+        import serialization
+
+        api.audit_writer.flush()
+        meta.update({
+            'logs_seeded': 0 if args.no_seed else args.logs,
+            'seed_s': round(seed_elapsed, 3),
+            'response_cache': args.response_cache,
+            'json_provider': 'orjson' if serialization.orjson is not None else 'stdlib',
+        })
+        report['peak_rss_kb'] = peak_rss_kb()
+    else:
+        meta['url'] = args.url
+        # سرور پردازه دیگری است؛ این عدد فقط حافظه کلاینت بنچمارک است
+        report['client_peak_rss_kb'] = peak_rss_kb()
+    report['results'] = results
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """کش کوچک thread-safe با انقضای زمانی و سقف اندازه."""
+
+    def __init__(self, ttl=30, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # قدیمی‌ترین ورودی حذف می‌شود
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LRUCache:
+    """کش LRU thread-safe با سقف تعداد ورودی و حجم کل (بایت) و آمار hit/miss."""
+
+    def __init__(self, maxsize=512, max_bytes=16 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[key] = value
+            self._bytes += size
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class DataVersion:
+    """شمارنده نسخه داده یک جدول که در پایگاه داده نگه داشته می‌شود.
+
+    نسخه بین همه پردازه‌ها و سرورها مشترک است. load خروجی (نسخه، زمان تغییر) می‌دهد و
+    increment نسخه را اتمیک بالا می‌برد و مقدار جدید را برمی‌گرداند. مقدار خوانده‌شده
+    حداکثر ttl ثانیه نگه داشته می‌شود؛ تغییرهای همین پردازه بلافاصله دیده می‌شوند.
+    """
+
+    def __init__(self, load, increment, ttl=1.0):
+        self.load = load
+        self.increment = increment
+        self.ttl = ttl
+        self._counter = 0
+        self._changed_at = 0.0
+        self._loaded_at = None
+        self._bumps = 0
+        self._lock = threading.Lock()
+
+    def bump(self):
+        counter, changed_at = self.increment()
+        with self._lock:
+            self._bumps += 1
+            self._store(counter, changed_at)
+
+    def _store(self, counter, changed_at):
+        self._counter = counter
+        self._changed_at = changed_at
+        self._loaded_at = time.monotonic()
+
+    def current(self):
+        """خروجی (نسخه، زمان آخرین تغییر به ثانیه)."""
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+            bumps = self._bumps
+        if not fresh:
+            counter, changed_at = self.load()
+            with self._lock:
+                # اگر همزمان با خواندن، نوشتنی در همین پردازه انجام شده مقدار خوانده‌شده کهنه است
+                if self._bumps == bumps:
+                    self._store(counter, changed_at)
+        with self._lock:
+            return str(self._counter), self._changed_at
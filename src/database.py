@@ -0,0 +1,86 @@
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+READ_BIND = 'read'
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_sqlite_memory(url):
+    """پایگاه داده SQLite در حافظه (sqlite:// یا :memory: یا mode=memory)."""
+    url = make_url(url)
+    return (is_sqlite(url) and (url.database in (None, '', ':memory:')
+                                or url.query.get('mode') == 'memory'))
+
+
+def sqlite_read_only_url(url):
+    """همان فایل SQLite در حالت فقط‌خواندنی."""
+    database = make_url(url).database
+    return f'sqlite:///file:{database}?mode=ro&uri=true'
+
+
+def engine_options(config, url):
+    """تنظیمات pool برای create_engine؛ SQLite فایل هم با QueuePool کار می‌کند.
+
+    SQLite در حافظه به پیش‌فرض Flask-SQLAlchemy (StaticPool و یک اتصال) سپرده می‌شود؛
+    pool جدا برای آن یعنی پایگاه داده جدا برای هر اتصال.
+    """
+    if is_sqlite_memory(url):
+        return {}
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if is_sqlite(url):
+        options['poolclass'] = QueuePool
+        options['connect_args'] = {
+            # زمان انتظار درایور برای قفل، به ثانیه
+            'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000,
+            'check_same_thread': False,
+        }
+    return options
+
+
+def apply_sqlite_pragmas(engine, config, read_only=False):
+    """PRAGMAها روی هر اتصال جدید اجرا می‌شوند."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = [
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+    ]
+    if read_only:
+        pragmas.append(('query_only', 'ON'))
+    else:
+        # حالت WAL در خود فایل ذخیره می‌شود و اتصال فقط‌خواندنی نمی‌تواند آن را عوض کند
+        pragmas.insert(0, ('journal_mode', config['SQLITE_JOURNAL_MODE']))
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+class ReadRoutingSession(Session):
+    """درخواست‌های GET/HEAD از engine فقط‌خواندنی می‌خوانند، اگر تعریف شده باشد."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context()
+                and request.method in ('GET', 'HEAD') and READ_BIND in self._db.engines):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,248 @@
+import collections
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# مرزهای هیستوگرام تاخیر، به ثانیه
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class SamplingProfiler:
+    """پروفایلر نمونه‌برداری: هر interval ثانیه پشته همه threadها شمرده می‌شود.
+
+    وقتی خاموش است هیچ thread یا hookی فعال نیست.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                            name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._stop is not None:
+                self._stop.set()
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def collapsed(self):
+        """خروجی به قالب collapsed stacks (قابل استفاده در flamegraph)."""
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def _run(self, stop):
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            frames = sys._current_frames()
+            sampled = []
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                    frame = frame.f_back
+                sampled.append(';'.join(reversed(names)))
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+
+
+class Metrics:
+    """ابزار اندازه‌گیری اختیاری: زمان هر مسیر، تعداد و زمان پرس‌وجوها، نمونه پرس‌وجوهای کند."""
+
+    def __init__(self, slow_query_ms=100, slow_query_samples=50, profiler_interval=0.005):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.slow_queries = collections.deque(maxlen=slow_query_samples)
+        self.profiler = SamplingProfiler(interval=profiler_interval)
+        self.latency = collections.defaultdict(Histogram)
+        self.requests = collections.Counter()
+        self.route_queries = collections.Counter()
+        self.route_sql_seconds = collections.Counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engines):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        for engine in engines:
+            self.instrument_engine(engine)
+
+        # زمان تبدیل به JSON جدا از زمان view اندازه گرفته می‌شود
+        encode = app.json.response
+
+        def timed_response(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return encode(*args, **kwargs)
+            finally:
+                if has_request_context() and '_metrics' in g:
+                    g._metrics['encode'] += time.perf_counter() - started
+
+        app.json.response = timed_response
+
+    def add_collector(self, collect):
+        """collect() دیکشنری {نام متریک: (نوع، مقدار)} برمی‌گرداند."""
+        self.collectors.append(collect)
+
+    def instrument_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_request(self):
+        g._metrics = {'start': time.perf_counter(), 'queries': 0, 'sql': 0.0, 'encode': 0.0}
+
+    def _after_request(self, response):
+        stats = g.pop('_metrics', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats['start']
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        with self._lock:
+            self.latency[(route, request.method)].observe(total)
+            self.requests[(route, request.method, response.status_code)] += 1
+            self.route_queries[route] += stats['queries']
+            self.route_sql_seconds[route] += stats['sql']
+
+        app_time = max(0.0, total - stats['sql'] - stats['encode'])
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={stats["sql"] * 1000:.2f};desc="{stats["queries"]} queries"',
+            f'encode;dur={stats["encode"] * 1000:.2f}',
+            f'app;dur={app_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        response.headers['Timing-Allow-Origin'] = '*'
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += elapsed
+        if has_request_context() and '_metrics' in g:
+            g._metrics['queries'] += 1
+            g._metrics['sql'] += elapsed
+        if elapsed >= self.slow_query_seconds:
+            self._sample_slow_query(conn, cursor, statement, parameters, executemany, elapsed)
+
+    def _sample_slow_query(self, conn, cursor, statement, parameters, executemany, elapsed):
+        plan = None
+        if (conn.dialect.name == 'sqlite' and not executemany
+                and statement.lstrip().upper().startswith(('SELECT', 'WITH'))):
+            explain = cursor.connection.cursor()
+            try:
+                explain.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+                plan = [row[-1] for row in explain.fetchall()]
+            except Exception:
+                plan = None
+            finally:
+                explain.close()
+        self.slow_queries.append({
+            'statement': statement,
+            'duration_ms': round(elapsed * 1000, 3),
+            'route': request.url_rule.rule if has_request_context() and request.url_rule else None,
+            'plan': plan,
+            'at': time.time(),
+        })
+
+    def prometheus(self):
+        """همه متریک‌ها در قالب متنی Prometheus."""
+        lines = [
+            '# HELP http_request_duration_seconds Request latency per route.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (route, method), histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append('http_request_duration_seconds_bucket'
+                                 + _labels(route=route, method=method, le=bound) + f' {cumulative}')
+                lines.append('http_request_duration_seconds_bucket'
+                             + _labels(route=route, method=method, le='+Inf') + f' {histogram.count}')
+                lines.append('http_request_duration_seconds_sum'
+                             + _labels(route=route, method=method) + f' {histogram.sum:.6f}')
+                lines.append('http_request_duration_seconds_count'
+                             + _labels(route=route, method=method) + f' {histogram.count}')
+
+            lines += ['# HELP http_requests_total Requests per route and status.',
+                      '# TYPE http_requests_total counter']
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append('http_requests_total' + _labels(route=route, method=method, status=status)
+                             + f' {count}')
+
+            lines += ['# HELP http_request_db_queries_total SQL statements run by requests per route.',
+                      '# TYPE http_request_db_queries_total counter']
+            for route, count in sorted(self.route_queries.items()):
+                lines.append('http_request_db_queries_total' + _labels(route=route) + f' {count}')
+
+            lines += ['# HELP http_request_db_seconds_total SQL time spent by requests per route.',
+                      '# TYPE http_request_db_seconds_total counter']
+            for route, seconds in sorted(self.route_sql_seconds.items()):
+                lines.append('http_request_db_seconds_total' + _labels(route=route) + f' {seconds:.6f}')
+
+            lines += ['# TYPE db_queries_total counter', f'db_queries_total {self.queries}',
+                      '# TYPE db_query_seconds_total counter', f'db_query_seconds_total {self.sql_seconds:.6f}',
+                      '# TYPE db_slow_query_samples gauge', f'db_slow_query_samples {len(self.slow_queries)}',
+                      '# TYPE profiler_samples_total counter', f'profiler_samples_total {self.profiler.samples}']
+
+        for collect in self.collectors:
+            for name, (kind, value) in sorted(collect().items()):
+                lines += [f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,105 @@
+import re
+
+from sqlalchemy import text
+
+# جدول FTS5 با توکنایزر trigram برای جستجوی زیررشته‌ای روی نام/شهر/شغل
+SEARCH_TABLE = 'user_search'
+SEARCH_COLUMNS = ('name', 'city', 'job')
+
+_PERSIAN_CHARS = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    '‌': ' ',  # ZWNJ
+    '‏': None,
+    'ً': None, 'ٌ': None, 'ٍ': None, 'َ': None,
+    'ُ': None, 'ِ': None, 'ّ': None, 'ْ': None,
+})
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_persian(value):
+    """یکسان‌سازی ی/ک عربی و فارسی، حذف اعراب و تبدیل نیم‌فاصله به فاصله."""
+    if value is None:
+        return ''
+    value = str(value).translate(_PERSIAN_CHARS).lower()
+    return _SPACES.sub(' ', value).strip()
+
+
+def fts5_available(connection):
+    try:
+        connection.execute(text("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x, tokenize='trigram')"))
+        connection.execute(text("DROP TABLE temp._fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def search_table_exists(connection):
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE},
+    ).first() is not None
+
+
+def create_search_table(connection):
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        f"USING fts5({', '.join(SEARCH_COLUMNS)}, tokenize='trigram')"
+    ))
+
+
+def _search_row(row_id, name, city, job):
+    return {
+        'rowid': row_id,
+        'name': normalize_persian(name),
+        'city': normalize_persian(city),
+        'job': normalize_persian(job),
+    }
+
+
+def index_rows(connection, rows):
+    """rows: دنباله‌ای از (id, name, city, job). متن یک بار در زمان ایندکس نرمال می‌شود."""
+    params = [_search_row(*row) for row in rows]
+    if not params:
+        return
+    connection.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+        [{'rowid': p['rowid']} for p in params],
+    )
+    connection.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} (rowid, name, city, job) VALUES (:rowid, :name, :city, :job)"),
+        params,
+    )
+
+
+def unindex_rows(connection, ids):
+    ids = list(ids)
+    if ids:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+            [{'rowid': row_id} for row_id in ids],
+        )
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match(filters):
+    """عبارت MATCH برای فیلترهای متنی نرمال‌شده؛ trigram حداقل سه کاراکتر می‌خواهد.
+
+    خروجی (عبارت MATCH یا None، فیلترهای کوتاه‌تر از سه کاراکتر).
+    """
+    terms = []
+    short = {}
+    for column in SEARCH_COLUMNS:
+        value = filters.get(column)
+        if not value:
+            continue
+        if len(value) >= 3:
+            terms.append(f'{column} : {_quote(value)}')
+        else:
+            short[column] = value
+    return (' AND '.join(terms) or None), short
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # وابستگی اختیاری
+    orjson = None
+
+
+def _default(value):
+    # زمان‌های ذخیره‌شده naive و به UTC هستند
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.isoformat() + 'Z'
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """اگر orjson نصب باشد با آن، وگرنه با json استاندارد؛ datetime مستقیم به ISO با Z تبدیل می‌شود."""
+
+    ensure_ascii = False
+    sort_keys = False
+    default = staticmethod(_default)
+
+    if orjson is not None:
+        options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=_default, option=self.options).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                orjson.dumps(obj, default=_default, option=self.options),
+                mimetype=self.mimetype,
+            )
@@ -0,0 +1,334 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+# پایگاه داده در حافظه تا فایل users.db دست نخورد
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+import pytest
+
+import app as api
+from metrics import Metrics
+
+
+@pytest.fixture(scope='module', autouse=True)
+def database():
+    api.app.config['AUDIT_ASYNC'] = False
+    api.initialize_database()
+
+
+@pytest.fixture
+def client():
+    client = api.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    return client
+
+
+def post_bulk(client, body, mimetype='application/x-ndjson', **args):
+    return client.post('/api/users/bulk', data=body, content_type=mimetype, query_string=args)
+
+
+def test_parse_bulk_row_insert():
+    op, params = api.parse_bulk_row({'name': 'نیما', 'age': '30', 'city': 'یزد', 'job': 'معلم'}, 'insert')
+    assert op == 'insert'
+    assert params == {'b_name': 'نیما', 'b_age': 30, 'b_city': 'یزد', 'b_job': 'معلم', 'b_isActive': True}
+
+
+def test_parse_bulk_row_partial_update():
+    op, params = api.parse_bulk_row({'op': 'update', 'id': '3', 'city': 'قم', 'age': ''}, 'insert')
+    assert op == 'update'
+    assert params == {'b_id': 3, 'b_name': None, 'b_age': None, 'b_city': 'قم', 'b_job': None}
+
+
+@pytest.mark.parametrize('row', [
+    None,
+    {'op': 'merge', 'id': 1},
+    {'name': 'نیما', 'age': 30},
+    {'op': 'update', 'city': 'قم'},
+    {'op': 'delete', 'id': 'x'},
+    {'op': 'active', 'id': 1, 'isActive': 'maybe'},
+])
+def test_parse_bulk_row_rejects_invalid(row):
+    with pytest.raises(ValueError):
+        api.parse_bulk_row(row, 'insert')
+
+
+def test_apply_bulk_chunk_reports_missing_users():
+    chunk = [
+        (1, 'insert', {'b_name': 'نیما', 'b_age': 30, 'b_city': 'یزد', 'b_job': 'معلم', 'b_isActive': True}),
+        (2, 'update', {'b_id': 1, 'b_name': None, 'b_age': 29, 'b_city': None, 'b_job': None}),
+        (3, 'delete', {'b_id': 999999}),
+    ]
+    with api.app.app_context():
+        with api.db.engine.begin() as connection:
+            counts, errors = api.apply_bulk_chunk(connection, chunk)
+        assert api.db.session.get(api.User, 1).age == 29
+
+    assert counts == {'insert': 1, 'update': 1, 'active': 0, 'delete': 0}
+    assert errors == [{'line': 3, 'error': 'کاربر یافت نشد'}]
+
+
+def test_bulk_reports_bad_lines_and_keeps_going(client):
+    api.app.config['BULK_CHUNK_SIZE'] = 2
+    etag = client.get('/api/users').headers['ETag']
+    body = b'\n'.join([
+        '{"name": "الف", "age": 20, "city": "یزد", "job": "معلم"}'.encode('utf-8'),
+        b'{"name": "\xff\xfe", "age": 20, "city": "x", "job": "y"}',
+        b'{not json',
+        '{"name": "ب", "age": 21, "city": "یزد", "job": "معلم"}'.encode('utf-8'),
+        '{"name": "پ", "age": 22, "city": "یزد", "job": "معلم"}'.encode('utf-8'),
+    ]) + b'\n'
+    try:
+        response = post_bulk(client, body)
+    finally:
+        api.app.config['BULK_CHUNK_SIZE'] = 1000
+
+    assert response.status_code == 200
+    assert response.json['inserted'] == 3
+    assert [error['line'] for error in response.json['errors']] == [2, 3]
+    assert client.get('/api/users').headers['ETag'] != etag
+
+
+def test_bulk_csv_reports_undecodable_row(client):
+    body = ('name,age,city,job\n'
+            'ج,40,کرج,راننده\n').encode('utf-8') + b'\xc3\x28,41,x,y\n' + 'چ,42,کرج,راننده\n'.encode('utf-8')
+    response = post_bulk(client, body, mimetype='text/csv')
+
+    assert response.status_code == 200
+    assert response.json['inserted'] == 2
+    assert response.json['errors'] == [{'line': 3, 'error': 'کدگذاری خط UTF-8 نیست'}]
+
+
+def test_bulk_without_valid_rows_keeps_version(client):
+    etag = client.get('/api/users').headers['ETag']
+    response = post_bulk(client, b'{not json\n')
+
+    assert response.json['error_count'] == 1
+    assert client.get('/api/users').headers['ETag'] == etag
+
+
+def test_reads_and_writes_without_table_version(client, monkeypatch):
+    # پایگاه داده‌ای که قبل از جدول نسخه ساخته شده و initialize_database رویش اجرا نشده
+    with api.app.app_context():
+        api.TableVersion.__table__.drop(api.db.engine)
+    monkeypatch.setattr(api, '_table_version_ready', False)
+    monkeypatch.setattr(api.user_version, 'ttl', 0)
+
+    response = client.get('/api/users')
+    assert response.status_code == 200
+    assert client.get('/api/users/1').status_code == 200
+
+    created = client.post('/api/users', json={'name': 'ت', 'age': 33, 'city': 'ساری', 'job': 'معلم'})
+    assert created.status_code == 201
+    assert client.get('/api/users').headers['ETag'] != response.headers['ETag']
+
+
+def test_bulk_invalidates_after_each_chunk(client, monkeypatch):
+    versions = []
+    mark_users_changed = api.mark_users_changed
+
+    def record():
+        mark_users_changed()
+        versions.append(api.user_version.current()[0])
+
+    monkeypatch.setattr(api, 'mark_users_changed', record)
+    monkeypatch.setitem(api.app.config, 'BULK_CHUNK_SIZE', 2)
+    rows = ''.join(f'{{"name": "د{i}", "age": 30, "city": "یزد", "job": "معلم"}}\n' for i in range(5))
+    response = post_bulk(client, rows.encode('utf-8'))
+
+    assert response.json['inserted'] == 5
+    assert len(versions) == 3 and len(set(versions)) == 3
+
+
+def test_count_cache_follows_writes_from_other_workers(client, monkeypatch):
+    monkeypatch.setattr(api.user_version, 'ttl', 0)
+    before = client.get('/api/users?age_min=50&age_max=50').json['total_items']
+    # نوشتن در worker دیگر: ردیف و نسخه عوض می‌شوند ولی کش این پردازه دست نمی‌خورد
+    with api.app.app_context():
+        with api.db.engine.begin() as connection:
+            connection.execute(api.User.__table__.insert(),
+                               {'name': 'ث', 'age': 50, 'city': 'ساری', 'job': 'معلم', 'isActive': True})
+        api.increment_table_version('user')
+
+    assert client.get('/api/users?age_min=50&age_max=50').json['total_items'] == before + 1
+
+
+@pytest.mark.parametrize('query', ['page=0', 'cursor=not-a-cursor'])
+def test_invalid_page_skips_count(client, monkeypatch, query):
+    def fail(*args):
+        raise AssertionError('count before validation')
+
+    monkeypatch.setattr(api, 'count_users', fail)
+    assert client.get(f'/api/users?{query}').status_code == 400
+
+
+def item_ids(response):
+    assert response.status_code == 200, response.json
+    return [item['id'] for item in response.json['items']]
+
+
+@pytest.fixture(scope='module')
+def gorgan_users():
+    ages = [30, 25, 30, 41, 25, 30, 19]
+    with api.app.app_context():
+        users = [api.User(name=f'کاربر {i}', age=age, city='گرگان', job='معلم') for i, age in enumerate(ages)]
+        api.db.session.add_all(users)
+        api.db.session.commit()
+        api.mark_users_changed()
+        return {user.id: (user.name, user.age) for user in users}
+
+
+@pytest.mark.parametrize('sort', ['id', 'age', 'name'])
+def test_cursor_walk_forward_and_back_with_filter(client, gorgan_users, sort):
+    key = {'id': lambda id_: id_,
+           'age': lambda id_: (gorgan_users[id_][1], id_),
+           'name': lambda id_: (gorgan_users[id_][0], id_)}[sort]
+    expected = sorted(gorgan_users, key=key)
+    url = f'/api/users?city=گرگان&sort={sort}&per_page=3&cursor='
+
+    pages = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(url + cursor)
+        pages.append(item_ids(response))
+        cursor = response.json['next_cursor']
+    assert [id_ for page in pages for id_ in page] == expected
+    assert response.json['total_items'] == len(expected)
+
+    for page in reversed(pages[:-1]):
+        response = client.get(url + response.json['prev_cursor'])
+        assert item_ids(response) == page
+    assert response.json['prev_cursor'] is None
+
+    last = client.get(url + response.json['last_cursor'])
+    assert item_ids(last) == expected[-3:]
+    assert last.json['next_cursor'] is None
+
+
+@pytest.mark.parametrize('sort, token', [
+    ('age', 'not-a-cursor'),
+    ('age', 'e30'),  # {}
+    ('age', api.encode_cursor('name', 'next', ['x', 1])),  # مرتب‌سازی دیگر
+    ('age', api.encode_cursor('age', 'next', ['x', 1])),
+    ('age', api.encode_cursor('age', 'next', [30])),
+    ('age', api.encode_cursor('age', 'next', [30, 1, 2])),
+    ('age', api.encode_cursor('age', 'sideways', [30, 1])),
+    ('id', api.encode_cursor('id', 'next', [True])),
+    ('id', api.encode_cursor('id', 'next', [1, 2])),
+])
+def test_malformed_user_cursor_is_rejected(client, sort, token):
+    assert client.get(f'/api/users?sort={sort}&cursor={token}').status_code == 400
+
+
+def search_names(client, name):
+    return [item['name'] for item in client.get('/api/users', query_string={'name': name}).json['items']]
+
+
+@pytest.fixture
+def fts():
+    if not api.user_search_enabled():
+        pytest.skip('FTS5 trigram در این SQLite در دسترس نیست')
+
+
+def test_search_follows_orm_update_and_delete(client, fts):
+    user_id = client.post('/api/users', json={'name': 'کیومرث زند', 'age': 40, 'city': 'شیراز',
+                                              'job': 'معمار'}).json['id']
+    assert search_names(client, 'کیومرث') == ['کیومرث زند']
+
+    client.put(f'/api/users/{user_id}', json={'name': 'بردیا زند'})
+    assert search_names(client, 'کیومرث') == []
+    assert search_names(client, 'بردیا') == ['بردیا زند']
+
+    client.delete(f'/api/users/{user_id}')
+    assert search_names(client, 'بردیا') == []
+
+
+def test_search_follows_bulk_update_and_delete(client, fts):
+    post_bulk(client, '{"name": "سیاوش مهر", "age": 35, "city": "بم", "job": "نقاش"}\n'.encode('utf-8'))
+    user_id = client.get('/api/users', query_string={'name': 'سیاوش'}).json['items'][0]['id']
+
+    post_bulk(client, f'{{"id": {user_id}, "name": "فرامرز مهر"}}\n'.encode('utf-8'), op='update')
+    assert search_names(client, 'سیاوش') == []
+    assert search_names(client, 'فرامرز') == ['فرامرز مهر']
+
+    post_bulk(client, f'{{"id": {user_id}}}\n'.encode('utf-8'), op='delete')
+    assert search_names(client, 'فرامرز') == []
+
+
+def test_ilike_fallback_matches_raw_term(client, monkeypatch):
+    monkeypatch.setattr(api, '_user_search_enabled', False)
+    # نیم‌فاصله در عبارت و ستون، بدون نرمال‌سازی
+    jobs = [item['job'] for item in client.get('/api/users', query_string={'job': 'برنامه‌نویس'}).json['items']]
+    assert jobs and set(jobs) == {'برنامه‌نویس'}
+
+
+def test_logs_since_with_offset_and_cursor_walk(client):
+    for active in (False, True, False):
+        client.patch('/api/users/2', json={'isActive': active})
+    tehran = timezone(timedelta(hours=3, minutes=30))
+    now = datetime.now(timezone.utc)
+    hour_ago = (now - timedelta(hours=1)).astimezone(tehran).isoformat()
+    in_an_hour = (now + timedelta(hours=1)).astimezone(tehran).isoformat()
+
+    assert item_ids(client.get('/api/logs', query_string={'since': in_an_hour})) == []
+    recent = item_ids(client.get('/api/logs', query_string={'since': hour_ago, 'per_page': 500}))
+    assert len(recent) >= 3
+
+    pages = []
+    response = client.get('/api/logs', query_string={'since': hour_ago, 'per_page': 2})
+    pages.append(item_ids(response))
+    while response.json['next_cursor']:
+        response = client.get('/api/logs', query_string={'since': hour_ago, 'per_page': 2,
+                                                          'cursor': response.json['next_cursor']})
+        pages.append(item_ids(response))
+    assert [id_ for page in pages for id_ in page] == recent
+
+    for page in reversed(pages[:-1]):
+        response = client.get('/api/logs', query_string={'since': hour_ago, 'per_page': 2,
+                                                          'cursor': response.json['prev_cursor']})
+        assert item_ids(response) == page
+
+
+@pytest.mark.parametrize('key', [[123, 1], [None, 1], ['not-a-date', 1], ['2024-01-01T00:00:00']])
+def test_malformed_log_cursor_is_rejected(client, key):
+    token = api.encode_cursor('timestamp', 'next', key)
+    assert client.get('/api/logs', query_string={'cursor': token}).status_code == 400
+
+
+def test_etag_revalidation_and_invalidation(client):
+    response = client.get('/api/users/1')
+    etag = response.headers['ETag']
+    assert client.get('/api/users/1', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/users/1', headers={'If-None-Match': '*'}).status_code == 304
+    assert client.get('/api/users/999999', headers={'If-None-Match': '*'}).status_code == 404
+
+    listing = client.get('/api/users?per_page=3').headers['ETag']
+    assert client.get('/api/users?per_page=3', headers={'If-None-Match': listing}).status_code == 304
+
+    client.patch('/api/users/1', json={'isActive': not response.json['isActive']})
+    changed = client.get('/api/users/1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert client.get('/api/users?per_page=3', headers={'If-None-Match': listing}).status_code == 200
+
+
+def test_weak_etag_and_if_modified_since_revalidate(client):
+    response = client.get('/api/users/1')
+    weak = 'W/' + response.headers['ETag']
+    assert client.get('/api/users/1', headers={'If-None-Match': weak}).status_code == 304
+    last_modified = response.headers['Last-Modified']
+    assert client.get('/api/users/1', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(api, 'metrics', Metrics())
+    monkeypatch.setitem(api.app.config, 'METRICS_TOKEN', 'scrape-secret')
+
+
+def test_metrics_requires_login_or_token(client, metrics):
+    anonymous = api.app.test_client()
+    assert anonymous.get('/api/metrics').status_code == 403
+    assert anonymous.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert anonymous.get('/api/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+    assert client.get('/api/metrics').status_code == 200